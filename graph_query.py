@@ -0,0 +1,345 @@
+"""
+graph_query.py
+Headless query engine for the walk / adjacency logic of the Path Visualizer.
+Runs exact-k walk counts, adjacency matrix powers and walk listings over many
+stored graph files without opening a Tk window, fanning the graphs out across
+a process pool.
+
+Supported graph files (picked by extension):
+- .json                 node-link JSON (edges under "links" or "edges")
+- .graphml              GraphML
+- .gml                  GML
+- .adjlist              adjacency list
+- .edgelist             networkx edge list (nx.write_edgelist or nx.write_weighted_edgelist)
+- .txt / .csv           plain edge list "u v [weight]" (commas allowed)
+
+How to use (CLI):
+    python graph_query.py graphs/*.json -k 2 3 4 --walks -o results.jsonl
+    python graph_query.py graphs/*.edgelist -k 3 --directed --format npz -o out_dir
+
+How to use (Python):
+    from graph_query import run_batch
+    for result in run_batch(["a.json", "b.json"], [2, 3], workers=4):
+        print(result["index"], result["graph"], result["seconds"])
+
+Results come back in completion order, not input order; use "index" to match
+them to the input list.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import networkx as nx
+import numpy as np
+
+
+# ---------------- Graph loading ----------------
+def _read_edgelist(path, directed):
+    G = nx.DiGraph() if directed else nx.Graph()
+    with open(path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.split("#", 1)[0].replace(",", " ").strip()
+            if not line:
+                continue
+            parts = line.split()
+            if len(parts) == 1:
+                G.add_node(parts[0])
+                continue
+            u, v = parts[0], parts[1]
+            try:
+                weight = float(parts[2]) if len(parts) > 2 else 1.0
+            except ValueError:
+                # extra columns are not weights; adjacency_matrix ignores weights anyway
+                weight = 1.0
+            G.add_edge(u, v, weight=weight)
+    return G
+
+
+def load_graph(path, directed=None):
+    """Load a graph file. `directed` forces the graph type; None keeps the file's own."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".json":
+        with open(path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        # older networkx and d3 store edges under "links", networkx >= 3.4 under "edges"
+        G = nx.node_link_graph(data, edges="links" if "links" in data else "edges")
+    elif ext == ".graphml":
+        G = nx.read_graphml(path)
+    elif ext == ".gml":
+        G = nx.read_gml(path)
+    elif ext == ".adjlist":
+        G = nx.read_adjlist(path, create_using=nx.DiGraph if directed else nx.Graph)
+    elif ext == ".edgelist":
+        try:
+            G = nx.read_edgelist(path, create_using=nx.DiGraph if directed else nx.Graph)
+        except TypeError:
+            # third column is a bare weight (nx.write_weighted_edgelist), not a data dict
+            G = _read_edgelist(path, bool(directed))
+    elif ext in (".txt", ".csv"):
+        G = _read_edgelist(path, bool(directed))
+    else:
+        raise ValueError(f"Unsupported graph file type '{ext}': {path}")
+
+    if directed is not None and G.is_directed() != directed:
+        G = G.to_directed() if directed else G.to_undirected()
+    return G
+
+
+# ---------------- Queries ----------------
+def adjacency_matrix(G):
+    """Return (sorted nodes, 0/1 adjacency matrix). Weights are ignored, as in the GUI."""
+    nodes = sorted(G.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    A = np.zeros((len(nodes), len(nodes)), dtype=np.int64)
+    for u, v in G.edges():
+        A[index[u], index[v]] = 1
+        if not G.is_directed():
+            A[index[v], index[u]] = 1
+    return nodes, A
+
+
+def walk_counts(A, k):
+    """A^k: entry (i, j) is the number of walks of exactly k edges from node i to node j.
+
+    Computed in int64 when the counts are guaranteed to fit, otherwise with Python ints
+    (dtype=object) so large counts stay exact instead of silently wrapping around.
+    """
+    n = A.shape[0]
+    max_degree = int(A.sum(axis=1).max()) if n else 0
+    # every row of A^k sums to at most max_degree**k, so n * max_degree**k bounds any entry and the total
+    if n * max_degree ** k > np.iinfo(np.int64).max:
+        A = A.astype(object)
+    return np.linalg.matrix_power(A, k)
+
+
+def total_walks(Ak):
+    """Total number of walks in A^k, summed with Python ints so it cannot overflow."""
+    return sum(int(x) for x in Ak.flat)
+
+
+def walks_exact_k(G, k):
+    """All walks (nodes may repeat) of exactly k edges, each as a list of nodes."""
+    collector = []
+
+    def dfs(current, remain_k, path):
+        if remain_k == 0:
+            collector.append(list(path))
+            return
+        for nbr in G.neighbors(current):
+            path.append(nbr)
+            dfs(nbr, remain_k - 1, path)
+            path.pop()
+
+    for start in G.nodes():
+        dfs(start, k, [start])
+    return collector
+
+
+def query_graph(path, ks, directed=None, list_walks=False):
+    """Run every k in `ks` against one graph file and return a result dict with timings."""
+    started = time.perf_counter()
+    result = {"graph": path}
+    try:
+        G = load_graph(path, directed)
+        nodes, A = adjacency_matrix(G)
+        result.update({
+            "directed": G.is_directed(),
+            "nodes": [str(node) for node in nodes],
+            "adjacency": A,
+            "queries": [],
+        })
+        for k in ks:
+            k_started = time.perf_counter()
+            Ak = walk_counts(A, k)
+            query = {"k": k, "walk_count": total_walks(Ak), "power": Ak}
+            if list_walks:
+                query["walks"] = [[str(node) for node in walk] for walk in walks_exact_k(G, k)]
+            query["seconds"] = time.perf_counter() - k_started
+            result["queries"].append(query)
+    except Exception as exc:
+        # one bad file should not abort a nightly batch; report it in the stream instead
+        result["error"] = f"{type(exc).__name__}: {exc}"
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def _query_task(index, path, ks, directed, list_walks):
+    result = query_graph(path, ks, directed, list_walks)
+    result["index"] = index
+    return result
+
+
+def _future_result(future, task, submitted):
+    try:
+        return future.result()
+    except Exception as exc:
+        return {
+            "graph": task[1],
+            "index": task[0],
+            "error": f"{type(exc).__name__}: {exc}",
+            "seconds": time.perf_counter() - submitted,
+        }
+
+
+def run_batch(paths, ks, directed=None, list_walks=False, workers=None, max_pending=None):
+    """Yield query_graph results for every path as they finish, computed in a process pool.
+
+    Results arrive in completion order; each carries "index", its position in `paths`.
+    Duplicate ks are queried once. At most `max_pending` graphs (default 2 * workers) are
+    in flight at once, so a slow graph does not hold back later output and finished results
+    do not pile up in memory. If a worker process dies, the graphs in flight on that pool are
+    reported with an "error" and the rest of the batch continues on a fresh pool.
+    workers=1 runs in-process, which is easier to debug and avoids pool start-up for small batches.
+    """
+    ks = list(dict.fromkeys(int(k) for k in ks))
+    if any(k < 0 for k in ks):
+        raise ValueError("k must be a non-negative integer.")
+    if workers is not None and workers < 1:
+        raise ValueError("workers must be a positive integer.")
+    if max_pending is not None and max_pending < 1:
+        raise ValueError("max_pending must be a positive integer.")
+    tasks = ((i, path, ks, directed, list_walks) for i, path in enumerate(paths))
+    if workers == 1:
+        for task in tasks:
+            yield _query_task(*task)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending = {}  # future -> (task, submit time)
+
+    def fail_pending():
+        # a dead worker (e.g. OOM-killed) breaks the whole pool and every graph still on it;
+        # report those as errors and carry on with a fresh pool for the rest of the batch
+        nonlocal pool
+        for future in list(pending):
+            yield _future_result(future, *pending.pop(future))
+        pool.shutdown(wait=False)
+        pool = ProcessPoolExecutor(max_workers=workers)
+
+    def drain():
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        broken = False
+        for future in done:
+            broken = broken or isinstance(future.exception(), BrokenProcessPool)
+            yield _future_result(future, *pending.pop(future))
+        if broken:
+            yield from fail_pending()
+
+    try:
+        for task in tasks:
+            try:
+                future = pool.submit(_query_task, *task)
+            except BrokenProcessPool:
+                yield from fail_pending()
+                future = pool.submit(_query_task, *task)
+            pending[future] = (task, time.perf_counter())
+            if len(pending) >= max_pending:
+                yield from drain()
+        while pending:
+            yield from drain()
+    finally:
+        pool.shutdown()
+
+
+# ---------------- Output ----------------
+def _jsonable(result):
+    out = dict(result)
+    if "adjacency" in out:
+        out["adjacency"] = out["adjacency"].tolist()
+    if "queries" in out:
+        out["queries"] = [dict(q, power=q["power"].tolist()) for q in out["queries"]]
+    return out
+
+
+def write_jsonl(results, fh):
+    """Write one JSON object per result as soon as it arrives. Returns the number written."""
+    count = 0
+    for result in results:
+        fh.write(json.dumps(_jsonable(result)) + "\n")
+        fh.flush()
+        count += 1
+    return count
+
+
+def _npz_counts(M):
+    # int64 loads without pickle; exact big-int counts (dtype=object) are stored as decimal strings
+    return M.astype(str) if M.dtype == object else M
+
+
+def write_npz(results, out_dir):
+    """Write one .npz per graph into out_dir (named after index and graph file). Returns the number written.
+
+    Everything is stored as plain numeric or string arrays, so np.load works without allow_pickle.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    count = 0
+    for i, result in enumerate(results):
+        i = result.get("index", i)
+        stem = os.path.splitext(os.path.basename(result["graph"]))[0]
+        arrays = {
+            "graph": np.array(result["graph"]),
+            "seconds": np.array(result["seconds"]),
+        }
+        if "error" in result:
+            arrays["error"] = np.array(result["error"])
+        else:
+            arrays["nodes"] = np.array(result["nodes"], dtype=str)
+            arrays["adjacency"] = result["adjacency"]
+            arrays["ks"] = np.array([q["k"] for q in result["queries"]], dtype=np.int64)
+            for q in result["queries"]:
+                arrays[f"A{q['k']}"] = _npz_counts(q["power"])
+                arrays[f"seconds_k{q['k']}"] = np.array(q["seconds"])
+                if "walks" in q:
+                    arrays[f"walks_k{q['k']}"] = np.array(q["walks"], dtype=str).reshape(-1, q["k"] + 1)
+        np.savez(os.path.join(out_dir, f"{i:06d}_{stem}.npz"), **arrays)
+        count += 1
+    return count
+
+
+# ---------------- CLI ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch walk / adjacency-power queries over graph files.")
+    parser.add_argument("graphs", nargs="+", help="graph files to query")
+    parser.add_argument("-k", type=int, nargs="+", required=True, help="walk lengths (edges) to query")
+    graph_type = parser.add_mutually_exclusive_group()
+    graph_type.add_argument("--directed", dest="directed", action="store_true", default=None,
+                            help="treat every graph as directed")
+    graph_type.add_argument("--undirected", dest="directed", action="store_false",
+                            help="treat every graph as undirected")
+    parser.add_argument("--walks", action="store_true", help="also list every walk (can be very large)")
+    parser.add_argument("--format", choices=("jsonl", "npz"), default="jsonl")
+    parser.add_argument("-o", "--output", help="JSONL file or .npz output directory (default: stdout for jsonl)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="graphs in flight at once (default: 2 * workers)")
+    args = parser.parse_args(argv)
+
+    if any(k < 0 for k in args.k):
+        parser.error("k must be a non-negative integer.")
+    if args.workers is not None and args.workers < 1:
+        parser.error("-j/--workers must be a positive integer.")
+    if args.max_pending is not None and args.max_pending < 1:
+        parser.error("--max-pending must be a positive integer.")
+    if args.format == "npz" and not args.output:
+        parser.error("--format npz needs an output directory (-o).")
+
+    results = run_batch(args.graphs, args.k, directed=args.directed, list_walks=args.walks,
+                        workers=args.workers, max_pending=args.max_pending)
+    if args.format == "npz":
+        write_npz(results, args.output)
+    elif args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            write_jsonl(results, fh)
+    else:
+        write_jsonl(results, sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
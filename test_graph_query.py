@@ -0,0 +1,182 @@
+"""
+test_graph_query.py
+Tests for the headless graph query engine. Run with: python -m pytest -q
+"""
+import io
+import json
+import os
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import graph_query
+from graph_query import (adjacency_matrix, load_graph, query_graph, run_batch, total_walks, walk_counts,
+                         walks_exact_k, write_jsonl, write_npz)
+
+# Triangle A-B-C: A^2 = [[2,1,1],[1,2,1],[1,1,2]] -> 12 walks of length 2
+TRIANGLE_EDGES = [("A", "B"), ("B", "C"), ("C", "A")]
+TRIANGLE_A2 = [[2, 1, 1], [1, 2, 1], [1, 1, 2]]
+
+_query_task = graph_query._query_task
+
+
+def _crash_on_boom(index, path, ks, directed, list_walks):
+    # stands in for a worker killed mid-job (e.g. by the OOM killer)
+    if "boom" in path:
+        os._exit(1)
+    return _query_task(index, path, ks, directed, list_walks)
+
+
+def _write_triangle(tmp_path, ext):
+    G = nx.Graph(TRIANGLE_EDGES)
+    path = tmp_path / f"triangle{ext}"
+    if ext == ".json":
+        path.write_text(json.dumps(nx.node_link_data(G)))
+    elif ext == ".graphml":
+        nx.write_graphml(G, path)
+    elif ext == ".gml":
+        nx.write_gml(G, path)
+    elif ext == ".adjlist":
+        nx.write_adjlist(G, path)
+    elif ext == ".edgelist":
+        nx.write_edgelist(G, path)
+    elif ext == ".txt":
+        path.write_text("# u v weight\nA B 2.5\nB C\nC A note\n")
+    elif ext == ".csv":
+        path.write_text("A,B\nB,C\nC,A\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("ext", [".json", ".graphml", ".gml", ".adjlist", ".edgelist", ".txt", ".csv"])
+def test_loaders_give_expected_walk_counts(tmp_path, ext):
+    result = query_graph(_write_triangle(tmp_path, ext), [2])
+    assert "error" not in result, result.get("error")
+    assert result["nodes"] == ["A", "B", "C"]
+    query = result["queries"][0]
+    assert query["power"].tolist() == TRIANGLE_A2
+    assert query["walk_count"] == 12
+
+
+def test_weighted_networkx_edgelist(tmp_path):
+    path = tmp_path / "weighted.edgelist"
+    nx.write_edgelist(nx.Graph([(0, 1, {"weight": 3.0})]), path)
+    nodes, A = adjacency_matrix(load_graph(str(path)))
+    assert nodes == ["0", "1"]
+    assert A.tolist() == [[0, 1], [1, 0]]
+
+
+def test_weighted_networkx_edgelist_bare_weights(tmp_path):
+    path = tmp_path / "weighted.edgelist"
+    nx.write_weighted_edgelist(nx.Graph([("A", "B", {"weight": 2}), ("B", "C", {"weight": 5})]), path)
+    result = query_graph(str(path), [1])
+    assert "error" not in result, result.get("error")
+    assert result["queries"][0]["power"].tolist() == [[0, 1, 0], [1, 0, 1], [0, 1, 0]]
+
+
+def test_node_link_json_with_links_key(tmp_path):
+    path = tmp_path / "d3.json"
+    path.write_text(json.dumps({
+        "directed": False,
+        "multigraph": False,
+        "graph": {},
+        "nodes": [{"id": "A"}, {"id": "B"}, {"id": "C"}],
+        "links": [{"source": "A", "target": "B"}, {"source": "B", "target": "C"}, {"source": "C", "target": "A"}],
+    }))
+    result = query_graph(str(path), [2])
+    assert "error" not in result, result.get("error")
+    assert result["queries"][0]["power"].tolist() == TRIANGLE_A2
+
+
+def test_directed_override(tmp_path):
+    path = _write_triangle(tmp_path, ".txt")
+    _, A = adjacency_matrix(load_graph(path, directed=True))
+    # A->B->C->A is a 3-cycle, so A^3 is the identity
+    assert walk_counts(A, 3).tolist() == np.eye(3, dtype=int).tolist()
+
+
+def test_unsupported_file_reported_as_error(tmp_path):
+    path = tmp_path / "graph.foo"
+    path.write_text("A B\n")
+    result = query_graph(str(path), [2])
+    assert result["error"].startswith("ValueError")
+
+
+@pytest.mark.parametrize("G", [nx.cycle_graph(5), nx.path_graph(4), nx.DiGraph([(0, 1), (1, 2), (2, 0), (0, 2)])])
+@pytest.mark.parametrize("k", [0, 1, 3])
+def test_walk_listing_matches_matrix_power(G, k):
+    _, A = adjacency_matrix(G)
+    assert len(walks_exact_k(G, k)) == walk_counts(A, k).sum()
+
+
+def test_walk_counts_do_not_overflow():
+    n, k = 60, 12
+    _, A = adjacency_matrix(nx.complete_graph(n))
+    assert total_walks(walk_counts(A, k)) == n * (n - 1) ** k
+
+
+def test_jsonl_round_trip(tmp_path):
+    path = _write_triangle(tmp_path, ".json")
+    out = io.StringIO()
+    assert write_jsonl(run_batch([path], [1, 2], list_walks=True, workers=1), out) == 1
+    line = json.loads(out.getvalue())
+    assert line["graph"] == path
+    assert line["index"] == 0
+    assert [q["k"] for q in line["queries"]] == [1, 2]
+    assert line["queries"][1]["power"] == TRIANGLE_A2
+    assert len(line["queries"][1]["walks"]) == 12
+    assert line["seconds"] >= 0
+
+
+def test_npz_round_trip_without_pickle(tmp_path):
+    path = _write_triangle(tmp_path, ".json")
+    out_dir = tmp_path / "out"
+    assert write_npz(run_batch([path], [2], list_walks=True, workers=1), str(out_dir)) == 1
+    with np.load(out_dir / "000000_triangle.npz") as data:
+        assert data["nodes"].tolist() == ["A", "B", "C"]
+        assert data["ks"].tolist() == [2]
+        assert data["A2"].tolist() == TRIANGLE_A2
+        assert data["walks_k2"].shape == (12, 3)
+        assert float(data["seconds"]) >= 0
+
+
+def test_run_batch_process_pool_covers_every_input(tmp_path):
+    paths = [_write_triangle(tmp_path, ext) for ext in (".json", ".csv", ".txt")]
+    results = list(run_batch(paths, [2], workers=2, max_pending=2))
+    assert sorted(r["index"] for r in results) == [0, 1, 2]
+    for r in results:
+        assert r["graph"] == paths[r["index"]]
+        assert r["queries"][0]["walk_count"] == 12
+
+
+def test_run_batch_survives_dead_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(graph_query, "_query_task", _crash_on_boom)
+    paths = [_write_triangle(tmp_path, ".json"), str(tmp_path / "boom.csv"), _write_triangle(tmp_path, ".csv")]
+    results = sorted(run_batch(paths, [2], workers=2, max_pending=1), key=lambda r: r["index"])
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert results[1]["graph"] == paths[1]
+    assert results[1]["error"].startswith("BrokenProcessPool")
+    assert results[0]["queries"][0]["walk_count"] == 12
+    assert results[2]["queries"][0]["walk_count"] == 12
+
+
+def test_duplicate_ks_queried_once(tmp_path):
+    path = _write_triangle(tmp_path, ".json")
+    result = next(run_batch([path], [2, 1, 2], workers=1))
+    assert [q["k"] for q in result["queries"]] == [2, 1]
+
+
+@pytest.mark.parametrize("option", [{"workers": 0}, {"workers": -1}, {"max_pending": 0}])
+def test_run_batch_rejects_non_positive_pool_sizes(tmp_path, option):
+    with pytest.raises(ValueError):
+        next(run_batch([_write_triangle(tmp_path, ".json")], [2], **option))
+
+
+def test_npz_empty_graph(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("")
+    out_dir = tmp_path / "out"
+    write_npz(run_batch([str(path)], [2], workers=1), str(out_dir))
+    with np.load(out_dir / "000000_empty.npz") as data:
+        assert data["nodes"].dtype.kind == "U"
+        assert data["A2"].shape == (0, 0)
@@ -16,9 +16,10 @@ How to use:
 import tkinter as tk
 from tkinter import simpledialog, messagebox
 import networkx as nx
-import numpy as np
 import math
 
+from graph_query import adjacency_matrix, walk_counts, walks_exact_k
+
 NODE_RADIUS = 18
 FONT = ("Arial", 10)
 
@@ -47,20 +48,15 @@ class VisualGraphApp:
     def _show_adjacency_matrix(self, k):
             
     # Build and display adjacency matrix and its k-th power.
-        nodes = sorted(self.G.nodes())
-        n = len(nodes)
-        if n == 0:
+        if self.G.number_of_nodes() == 0:
             return
 
-        # --- Build adjacency matrix ---
-        A = np.zeros((n, n), dtype=int)
-        for i, u in enumerate(nodes):
-            for j, v in enumerate(nodes):
-                if self.G.has_edge(u, v):
-                    A[i, j] = 1  # treat as 1 for connectivity (ignore weight)
+        # --- Build adjacency matrix (weights ignored) ---
+        nodes, A = adjacency_matrix(self.G)
+        n = len(nodes)
 
         # --- Compute A^k for path counts ---
-        Ak = np.linalg.matrix_power(A, k)
+        Ak = walk_counts(A, k)
 
         # --- Prepare display text ---
         matrix_str = f"\nAdjacency Matrix (A):\n"
@@ -380,12 +376,8 @@ class VisualGraphApp:
             return
 
         self.clear_highlights()
-        all_paths = []
-        nodes = list(self.G.nodes())
-
         # Generate all walks (can revisit nodes)
-        for start in nodes:
-            self._dfs_walks_exact_k(start, k, [start], all_paths)
+        all_paths = walks_exact_k(self.G, k)
 
         # Group by start→end
         grouped = {}
@@ -414,17 +406,6 @@ class VisualGraphApp:
         self._show_adjacency_matrix(k)
 
 
-    def _dfs_walks_exact_k(self, current, remain_k, path, collector):
-        """DFS for all walks (nodes may repeat) of exactly k edges."""
-        if remain_k == 0:
-            collector.append(list(path))
-            return
-        for nbr in self.G.neighbors(current):
-            path.append(nbr)
-            self._dfs_walks_exact_k(nbr, remain_k - 1, path, collector)
-            path.pop()
-
-
     def _report_paths(self, paths, k):
         self.result_box.config(state=tk.NORMAL)
         self.result_box.config(state=tk.DISABLED)